@@ -1,43 +1,150 @@
-import requests
+import asyncio
+import sys
+import aiohttp
+import numpy as np
 import pandas as pd
 import time
 import hmac
 import hashlib
+import functools
+import os
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from dateutil.tz import tzlocal
 import logging
+from urllib.parse import urlencode
+from yarl import URL
+
+# orjson is optional: faster JSON encoding/decoding of the API payloads when installed
+try:
+    import orjson
+    json_loads = orjson.loads
+    json_dumps = orjson.dumps
+except ImportError:
+    import json
+    json_loads = json.loads
+    json_dumps = json.dumps
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Request ceilings per API (requests per second, requests in flight)
+BYBIT_MAX_PER_SECOND = 10
+BYBIT_MAX_AT_ONCE = 8
+HYPERLIQUID_MAX_PER_SECOND = 2
+HYPERLIQUID_MAX_AT_ONCE = 4
+# Keep-alive connections shared by all extraction requests
+HTTP_POOL_SIZE = 16
+# Detail exports next to the summary CSV: Excel workbook, Feather files per sheet, or none
+EXPORT_FORMATS = ('xlsx', 'feather', None)
+# Rows converted to Python objects at a time while writing a report sheet
+EXCEL_CHUNK_ROWS = 10000
+# Raw Hyperliquid fields kept per record and the dtypes they are converted to
+HL_TRADE_FIELDS = ['time', 'coin', 'dir', 'px', 'sz', 'fee', 'closedPnl']
+HL_TRADE_DTYPES = {'time': 'int64', 'coin': 'category', 'dir': 'category',
+                   'px': 'float64', 'sz': 'float64', 'fee': 'float64', 'closedPnl': 'float64'}
+HL_FUNDING_FIELDS = ['coin', 'szi', 'usdc', 'fundingRate']
+HL_FUNDING_DTYPES = {'time': 'int64', 'coin': 'category', 'sz': 'float64', 'payment': 'float64', 'rate': 'float64'}
+# Extracts ending within this many seconds of now may still grow, so they are never cached
+CACHE_OPEN_WINDOW_SECONDS = 3600
+# Environment variables holding the account credentials, in constructor order
+CREDENTIAL_ENV_VARS = ('HYPERLIQUID_ADDRESS', 'BYBIT_API_KEY', 'BYBIT_API_SECRET')
+# Failed requests seen by the running extract; a partial result must not be cached
+REQUEST_FAILURES = contextvars.ContextVar('request_failures', default=None)
+
+def cached_extract(kind: str):
+    """Cache an extract_* coroutine's DataFrame to parquet keyed by (kind, start_ms, end_ms, account hash)"""
+    def decorator(extract):
+        @functools.wraps(extract)
+        async def wrapper(self, session, start_datetime: datetime, end_datetime: datetime, *args, **kwargs):
+            # The target coins/symbols filter the extract, so they are part of the key
+            targets = args[0] if args else next(iter(kwargs.values()), None)
+            cache_path = self._extract_cache_path(kind, start_datetime, end_datetime, targets)
+            if cache_path and os.path.exists(cache_path):
+                try:
+                    df = pd.read_parquet(cache_path)
+                    logger.info(f"📦 Loaded {len(df)} {kind} records from cache")
+                    return df
+                except Exception as e:
+                    logger.warning(f"⚠️  Ignoring unreadable cache file {cache_path}: {e}")
+            
+            # Tasks started by the extract copy this context, so they all report into the same list
+            failures = []
+            REQUEST_FAILURES.set(failures)
+            df = await extract(self, session, start_datetime, end_datetime, *args, **kwargs)
+            
+            if cache_path and failures:
+                logger.warning(f"⚠️  Not caching {kind} records: {len(failures)} request(s) failed")
+            elif cache_path:
+                try:
+                    os.makedirs(self.cache_dir, exist_ok=True)
+                    tmp_path = f"{cache_path}.tmp"
+                    df.to_parquet(tmp_path, compression='snappy')
+                    os.replace(tmp_path, cache_path)
+                except (ImportError, ValueError, TypeError, OSError) as e:
+                    logger.warning(f"⚠️  Could not cache {kind} records: {e}")
+            return df
+        return wrapper
+    return decorator
+
+class RequestLimiter:
+    """Async context manager that bounds requests in flight and spaces request starts"""
+    def __init__(self, max_per_second: float, max_at_once: int):
+        self.interval = 1 / max_per_second
+        self.max_at_once = max_at_once
+        self._next_start = 0.0
+        self._semaphore = None
+        self._loop = None
+    
+    def _get_semaphore(self):
+        # Semaphores are bound to an event loop, and each analysis run uses a new one
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_at_once)
+        return self._semaphore
+    
+    async def __aenter__(self):
+        await self._get_semaphore().acquire()
+        now = time.monotonic()
+        delay = self._next_start - now
+        self._next_start = max(now, self._next_start) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        self._semaphore.release()
+
 class FundingArbitrageAnalyzer:
-    def __init__(self, hyperliquid_address: str, bybit_api_key: str, bybit_api_secret: str):
+    def __init__(self, hyperliquid_address: str, bybit_api_key: str, bybit_api_secret: str, cache_dir: str = None):
         self.hl_address = hyperliquid_address
         self.bb_api_key = bybit_api_key
         self.bb_api_secret = bybit_api_secret
+        # HMAC keyed once with the secret; each signature starts from a copy of it
+        self._bb_hmac_template = hmac.new(bybit_api_secret.encode('utf-8'), digestmod=hashlib.sha256)
         self.bb_base_url = "https://api.bybit.com"
         self.bb_recv_window = 5000  # Bybit recommended recv window
+        self.hl_base_url = "https://api.hyperliquid.xyz"
+        self._bb_limiter = RequestLimiter(BYBIT_MAX_PER_SECOND, BYBIT_MAX_AT_ONCE)
+        self._hl_limiter = RequestLimiter(HYPERLIQUID_MAX_PER_SECOND, HYPERLIQUID_MAX_AT_ONCE)
+        self.cache_dir = cache_dir  # Directory for cached extracts (None disables caching)
+        # Excel reports are written in the background; excel_future tracks the latest one
+        self._excel_executor = ThreadPoolExecutor(max_workers=1)
+        self.excel_future = None
     
-    def _bb_signed_request(self, endpoint: str, params: dict):
+    async def _bb_signed_request(self, session: aiohttp.ClientSession, endpoint: str, params: dict):
         """Make signed Bybit request"""
         timestamp = str(int(time.time() * 1000))
         
-        # Prepare the request to get the exact query string
-        req = requests.Request("GET", f"{self.bb_base_url}{endpoint}", params=params)
-        prepared = requests.Session().prepare_request(req)
-        
-        # Extract the raw query string from the prepared request
-        if '?' in prepared.path_url:
-            raw_query_string = prepared.path_url.split("?", 1)[1]
-        else:
-            raw_query_string = ""
+        # Build the query string once; it is both signed and sent as-is
+        raw_query_string = urlencode(params, doseq=True)
         
         # Create signature string according to Bybit docs
         sign_str = f"{timestamp}{self.bb_api_key}{self.bb_recv_window}{raw_query_string}"
-        signature = hmac.new(
-            self.bb_api_secret.encode('utf-8'),
-            sign_str.encode('utf-8'),
-            hashlib.sha256
-        ).hexdigest()
+        signer = self._bb_hmac_template.copy()
+        signer.update(sign_str.encode('utf-8'))
+        signature = signer.hexdigest()
         
         headers = {
             'X-BAPI-API-KEY': self.bb_api_key,
@@ -46,18 +153,104 @@ class FundingArbitrageAnalyzer:
             'X-BAPI-SIGN': signature
         }
         
-        response = requests.get(f"{self.bb_base_url}{endpoint}", params=params, headers=headers)
+        # Send the exact query string that was signed (no re-encoding by aiohttp)
+        url = f"{self.bb_base_url}{endpoint}"
+        if raw_query_string:
+            url = f"{url}?{raw_query_string}"
         
-        if response.status_code == 200:
-            data = response.json()
-            if data.get('retCode') == 0:
-                return data.get('result', {})
+        async with self._bb_limiter, session.get(URL(url, encoded=True), headers=headers) as response:
+            if response.status == 200:
+                data = json_loads(await response.read())
+                if data.get('retCode') == 0:
+                    return data.get('result', {})
+                else:
+                    logger.error(f"Bybit API error: {data.get('retCode')} - {data.get('retMsg')}")
+                    self._record_request_failure(endpoint)
+                    return {}
             else:
-                logger.error(f"Bybit API error: {data.get('retCode')} - {data.get('retMsg')}")
+                logger.error(f"Bybit HTTP error: {response.status} - {await response.text()}")
+                self._record_request_failure(endpoint)
                 return {}
-        else:
-            logger.error(f"Bybit HTTP error: {response.status_code} - {response.text}")
-            return {}
+    
+    async def _bb_fetch_all(self, session: aiohttp.ClientSession, requests_to_fetch: list):
+        """Fetch all pages for a list of (endpoint, params) Bybit requests.
+        
+        First pages are queued for every request up front; a follow-up page is queued as
+        soon as a response returns a cursor. Returns one list of records per request.
+        """
+        pending = asyncio.Queue()
+        for index, (endpoint, params) in enumerate(requests_to_fetch):
+            pending.put_nowait((index, endpoint, params))
+        records = [[] for _ in requests_to_fetch]
+        
+        async def worker():
+            while True:
+                index, endpoint, params = await pending.get()
+                try:
+                    result = await self._bb_signed_request(session, endpoint, params)
+                    if result:
+                        records[index].extend(result.get('list', []))
+                        cursor = result.get('nextPageCursor')
+                        if cursor:
+                            pending.put_nowait((index, endpoint, {**params, 'cursor': cursor}))
+                finally:
+                    pending.task_done()
+        
+        if not requests_to_fetch:
+            return records
+        
+        workers = [asyncio.create_task(worker()) for _ in range(min(BYBIT_MAX_AT_ONCE, len(requests_to_fetch)))]
+        all_done = asyncio.ensure_future(pending.join())
+        done, _ = await asyncio.wait([all_done, *workers], return_when=asyncio.FIRST_COMPLETED)
+        for task in [all_done, *workers]:
+            task.cancel()
+        # Workers only finish early by raising; surface the error
+        for task in done:
+            if task is not all_done:
+                task.result()
+        
+        return records
+    
+    async def _hl_info_request(self, session: aiohttp.ClientSession, payload: dict):
+        """Make Hyperliquid info request"""
+        headers = {'Content-Type': 'application/json'}
+        async with self._hl_limiter, session.post(f"{self.hl_base_url}/info", data=json_dumps(payload), headers=headers) as response:
+            if response.status != 200:
+                logger.warning(f"❌ Request failed with status {response.status}")
+                self._record_request_failure(payload.get('type'))
+                return []
+            return json_loads(await response.read())
+    
+    def _record_request_failure(self, request: str):
+        """Note a failed request so the running extract is not cached"""
+        failures = REQUEST_FAILURES.get()
+        if failures is not None:
+            failures.append(request)
+    
+    def _extract_cache_path(self, kind: str, start_datetime: datetime, end_datetime: datetime, targets: set = None):
+        """Parquet cache path for an extract, or None when caching does not apply"""
+        if not self.cache_dir:
+            return None
+        if end_datetime.timestamp() > time.time() - CACHE_OPEN_WINDOW_SECONDS:
+            # The tail of the range may still receive records
+            return None
+        start_ms = int(start_datetime.timestamp() * 1000)
+        end_ms = int(end_datetime.timestamp() * 1000)
+        account = f"{self.hl_address}|{self.bb_api_key}|{','.join(sorted(targets or []))}"
+        account_hash = hashlib.sha256(account.encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"{kind}_{start_ms}_{end_ms}_{account_hash}.parquet")
+    
+    def _time_windows(self, start_timestamp: int, end_timestamp: int, window_ms: int):
+        """Split a millisecond range into consecutive (start, end) request windows"""
+        windows = []
+        next_start = start_timestamp
+        
+        while next_start < end_timestamp:
+            window_end = min(next_start + window_ms, end_timestamp)
+            windows.append((next_start, window_end))
+            next_start = window_end + 1
+        
+        return windows
     
     def _parse_datetime_string(self, date_str: str, time_str: str = None):
         """Parse date and optional time string to datetime object"""
@@ -67,152 +260,128 @@ class FundingArbitrageAnalyzer:
         else:
             return datetime.strptime(date_str, "%Y-%m-%d")
     
-    def extract_hyperliquid_trades(self, start_datetime: datetime, end_datetime: datetime):
+    def _to_local_datetime(self, timestamps_ms: pd.Series):
+        """Convert epoch-millisecond timestamps to naive local datetimes (like datetime.fromtimestamp)"""
+        return pd.to_datetime(timestamps_ms, unit='ms', utc=True).dt.tz_convert(tzlocal()).dt.tz_localize(None)
+    
+    @cached_extract('hl_trades')
+    async def extract_hyperliquid_trades(self, session: aiohttp.ClientSession, start_datetime: datetime, end_datetime: datetime,
+                                         target_coins: set = None):
         """Extract Hyperliquid trades within date range"""
         logger.info(f"🔥 Extracting Hyperliquid trades from {start_datetime} to {end_datetime}")
         
         start_timestamp = int(start_datetime.timestamp() * 1000)
         end_timestamp = int(end_datetime.timestamp() * 1000)
         
-        trade_data = []
-        seen_trades = set()
+        fills = []
         batch_size_ms = 24 * 60 * 60 * 1000  # 1 day in milliseconds
-        next_start = start_timestamp
+        windows = self._time_windows(start_timestamp, end_timestamp, batch_size_ms)
         
-        while next_start < end_timestamp:
-            batch_end = min(next_start + batch_size_ms, end_timestamp)
-            
-            payload = {
+        # Request all day batches concurrently
+        batches = await asyncio.gather(*[
+            self._hl_info_request(session, {
                 "type": "userFills",
                 "user": self.hl_address,
-                "startTime": next_start,
+                "startTime": batch_start,
                 "endTime": batch_end
-            }
-            
-            response = requests.post("https://api.hyperliquid.xyz/info", json=payload)
-            if response.status_code != 200:
-                logger.warning(f"❌ Request failed with status {response.status_code}")
-                break
-            
-            batch = response.json()
-            if not batch:
-                next_start = batch_end + 1
-                continue
-            
-            for fill in batch:
-                trade_id = f"{fill.get('time', 0)}_{fill.get('coin', '')}_{fill.get('px', 0)}_{fill.get('sz', 0)}_{fill.get('dir', '')}"
-                
-                if trade_id not in seen_trades:
-                    seen_trades.add(trade_id)
-                    trade_data.append({
-                        'time': datetime.fromtimestamp(fill.get('time', 0) / 1000).strftime('%Y-%m-%d %H:%M:%S'),
-                        'coin': fill.get('coin', ''),
-                        'dir': fill.get('dir', ''),
-                        'px': float(fill.get('px', 0)),
-                        'sz': float(fill.get('sz', 0)),
-                        'ntl': float(fill.get('sz', 0)) * float(fill.get('px', 0)),
-                        'fee': float(fill.get('fee', 0)),
-                        'closedPnl': float(fill.get('closedPnl', 0))
-                    })
-            
-            next_start = batch_end + 1
-            time.sleep(0.2)
+            })
+            for batch_start, batch_end in windows
+        ])
         
-        df = pd.DataFrame(trade_data)
+        # Keep only fills for the target coins (if given) as soon as they are received
+        for batch in batches:
+            if target_coins:
+                fills.extend(fill for fill in batch if fill.get('coin') in target_coins)
+            else:
+                fills.extend(batch)
         
-        # Additional client-side filtering to ensure date range compliance
-        if len(df) > 0:
-            df['datetime'] = pd.to_datetime(df['time'])
-            start_dt = pd.to_datetime(start_datetime)
-            end_dt = pd.to_datetime(end_datetime)
-            
-            # Filter out trades outside the specified date range
-            before_filter = len(df)
-            df = df[(df['datetime'] >= start_dt) & (df['datetime'] <= end_dt)]
-            after_filter = len(df)
-            
-            if before_filter != after_filter:
-                logger.info(f"⚠️  Filtered out {before_filter - after_filter} trades outside date range")
-            
-            # Remove the temporary datetime column
-            df = df.drop('datetime', axis=1)
+        # Build the frame from the raw fills and convert whole columns at once
+        df = pd.DataFrame.from_records(fills, columns=HL_TRADE_FIELDS)
+        # Fills without a time count as epoch 0 (as before), so the int64 cast cannot fail on NaN
+        df['time'] = df['time'].fillna(0)
+        
+        # Drop fills returned more than once (compared on the raw values)
+        df = df.drop_duplicates(subset=['time', 'coin', 'px', 'sz', 'dir'])
+        
+        df = df.astype(HL_TRADE_DTYPES, copy=False)
+        df.insert(5, 'ntl', df['sz'] * df['px'])
+        
+        # Additional client-side filtering to ensure date range compliance (on the raw epoch-ms values)
+        before_filter = len(df)
+        df = df[(df['time'] >= start_timestamp) & (df['time'] <= end_timestamp)]
+        after_filter = len(df)
+        
+        if before_filter != after_filter:
+            logger.info(f"⚠️  Filtered out {before_filter - after_filter} trades outside date range")
+        
+        # Keep time as datetime64; strings are only produced when displaying
+        df = df.assign(time=self._to_local_datetime(df['time']))
         
         logger.info(f"✅ Extracted {len(df)} Hyperliquid trades")
         return df
     
-    def extract_hyperliquid_funding(self, start_datetime: datetime, end_datetime: datetime):
+    @cached_extract('hl_funding')
+    async def extract_hyperliquid_funding(self, session: aiohttp.ClientSession, start_datetime: datetime, end_datetime: datetime,
+                                          target_coins: set = None):
         """Extract Hyperliquid funding within date range"""
         logger.info(f"🔥 Extracting Hyperliquid funding from {start_datetime} to {end_datetime}")
         
         start_timestamp = int(start_datetime.timestamp() * 1000)
         end_timestamp = int(end_datetime.timestamp() * 1000)
         
-        funding_data = []
-        seen_funding = set()
+        funding_records = []
         batch_size_ms = 24 * 60 * 60 * 1000
-        next_start = start_timestamp
+        windows = self._time_windows(start_timestamp, end_timestamp, batch_size_ms)
         
-        while next_start < end_timestamp:
-            batch_end = min(next_start + batch_size_ms, end_timestamp)
-            
-            payload = {
+        # Request all day batches concurrently
+        batches = await asyncio.gather(*[
+            self._hl_info_request(session, {
                 "type": "userFunding",
                 "user": self.hl_address,
-                "startTime": next_start,
+                "startTime": batch_start,
                 "endTime": batch_end
-            }
-            
-            response = requests.post("https://api.hyperliquid.xyz/info", json=payload)
-            if response.status_code != 200:
-                logger.warning(f"❌ Request failed with status {response.status_code}")
-                break
-            
-            batch = response.json()
-            if not batch:
-                next_start = batch_end + 1
-                continue
-            
-            for fund in batch:
-                delta = fund.get('delta', {})
-                funding_id = f"{fund.get('time', 0)}_{delta.get('coin', '')}_{delta.get('szi', 0)}_{delta.get('usdc', 0)}"
-                
-                if funding_id not in seen_funding:
-                    seen_funding.add(funding_id)
-                    funding_data.append({
-                        'time': datetime.fromtimestamp(fund.get('time', 0) / 1000).strftime('%Y-%m-%d %H:%M:%S'),
-                        'coin': delta.get('coin', ''),
-                        'sz': float(delta.get('szi', 0)),
-                        'side': 'Long' if float(delta.get('szi', 0)) > 0 else 'Short',
-                        'payment': float(delta.get('usdc', 0)),
-                        'rate': float(delta.get('fundingRate', 0))
-                    })
-            
-            next_start = batch_end + 1
-            time.sleep(0.2)
+            })
+            for batch_start, batch_end in windows
+        ])
         
-        df = pd.DataFrame(funding_data)
+        # Keep only funding for the target coins (if given) as soon as it is received
+        for batch in batches:
+            if target_coins:
+                funding_records.extend(fund for fund in batch if fund.get('delta', {}).get('coin') in target_coins)
+            else:
+                funding_records.extend(batch)
         
-        # Additional client-side filtering to ensure date range compliance
-        if len(df) > 0:
-            df['datetime'] = pd.to_datetime(df['time'])
-            start_dt = pd.to_datetime(start_datetime)
-            end_dt = pd.to_datetime(end_datetime)
-            
-            # Filter out funding outside the specified date range
-            before_filter = len(df)
-            df = df[(df['datetime'] >= start_dt) & (df['datetime'] <= end_dt)]
-            after_filter = len(df)
-            
-            if before_filter != after_filter:
-                logger.info(f"⚠️  Filtered out {before_filter - after_filter} funding records outside date range")
-            
-            # Remove the temporary datetime column
-            df = df.drop('datetime', axis=1)
+        # Build the frame from the raw funding deltas and convert whole columns at once
+        df = pd.DataFrame.from_records([fund.get('delta', {}) for fund in funding_records], columns=HL_FUNDING_FIELDS)
+        df.insert(0, 'time', [fund.get('time', 0) for fund in funding_records])
+        
+        # Drop funding records returned more than once
+        df = df.drop_duplicates(subset=['time', 'coin', 'szi', 'usdc'])
+        
+        df = df.rename(columns={'szi': 'sz', 'usdc': 'payment', 'fundingRate': 'rate'})
+        df = df.astype(HL_FUNDING_DTYPES, copy=False)
+        df.insert(3, 'side', np.where(df['sz'] > 0, 'Long', 'Short'))
+        
+        # Additional client-side filtering to ensure date range compliance (on the raw epoch-ms values)
+        before_filter = len(df)
+        df = df[(df['time'] >= start_timestamp) & (df['time'] <= end_timestamp)]
+        after_filter = len(df)
+        
+        if before_filter != after_filter:
+            logger.info(f"⚠️  Filtered out {before_filter - after_filter} funding records outside date range")
+        
+        # Keep time as datetime64 (strings are only produced when displaying) and side as a categorical
+        df = df.assign(
+            time=self._to_local_datetime(df['time']),
+            side=df['side'].astype('category')
+        )
         
         logger.info(f"✅ Extracted {len(df)} Hyperliquid funding records")
         return df
     
-    def extract_bybit_data(self, start_datetime: datetime, end_datetime: datetime):
+    @cached_extract('bybit')
+    async def extract_bybit_data(self, session: aiohttp.ClientSession, start_datetime: datetime, end_datetime: datetime,
+                                 target_symbols: set = None):
         """Extract Bybit data within date range"""
         logger.info(f"🔥 Extracting Bybit data from {start_datetime} to {end_datetime}")
         
@@ -223,168 +392,379 @@ class FundingArbitrageAnalyzer:
         
         # Bybit limits: 7 days per request, so we need to chunk
         seven_days_ms = 7 * 24 * 60 * 60 * 1000
+        windows = self._time_windows(start_timestamp, end_timestamp, seven_days_ms)
         
-        # First, get list of all executed orders to find symbols
-        symbols = set()
-        current_start = start_timestamp
-        
-        while current_start < end_timestamp:
-            current_end = min(current_start + seven_days_ms, end_timestamp)
-            
-            # Get execution list for linear perpetuals
-            params = {
-                'category': 'linear',
-                'startTime': str(current_start),
-                'endTime': str(current_end),
-                'limit': '100'
-            }
+        if target_symbols:
+            # Symbols are already known, no need for a discovery pass
+            symbols = set(target_symbols)
+        else:
+            # First, get list of all executed orders to find symbols
+            window_executions = await self._bb_fetch_all(session, [
+                ("/v5/execution/list", {
+                    'category': 'linear',
+                    'startTime': str(window_start),
+                    'endTime': str(window_end),
+                    'limit': '100'
+                })
+                for window_start, window_end in windows
+            ])
             
-            cursor = None
-            while True:
-                if cursor:
-                    params['cursor'] = cursor
-                
-                result = self._bb_signed_request("/v5/execution/list", params)
-                if not result:
-                    break
-                
-                executions = result.get('list', [])
+            symbols = set()
+            for executions in window_executions:
                 for exec in executions:
                     symbols.add(exec.get('symbol', ''))
-                
-                cursor = result.get('nextPageCursor')
-                if not cursor:
-                    break
-                time.sleep(0.1)
             
-            current_start = current_end + 1
-        
-        logger.info(f"Found {len(symbols)} unique symbols with trades")
+            logger.info(f"Found {len(symbols)} unique symbols with trades")
         
-        # Now get detailed data for each symbol
-        for symbol in symbols:
-            if not symbol:
-                continue
-            
-            # Get trades
-            current_start = start_timestamp
-            while current_start < end_timestamp:
-                current_end = min(current_start + seven_days_ms, end_timestamp)
-                
-                params = {
-                    'category': 'linear',
-                    'symbol': symbol,
-                    'startTime': str(current_start),
-                    'endTime': str(current_end),
-                    'limit': '100'
-                }
-                
-                cursor = None
-                while True:
-                    if cursor:
-                        params['cursor'] = cursor
-                    
-                    result = self._bb_signed_request("/v5/execution/list", params)
-                    if not result:
-                        break
-                    
-                    executions = result.get('list', [])
-                    for exec in executions:
-                        exec_type = exec.get('execType', '')
-                        
-                        if exec_type == 'Funding':
-                            # Funding fee record
-                            combined_data.append({
-                                'type': 'FUNDING_FEE',
-                                'time': datetime.fromtimestamp(int(exec.get('execTime', 0)) / 1000).strftime('%Y-%m-%d %H:%M:%S'),
-                                'symbol': exec.get('symbol', ''),
-                                'amount': -float(exec.get('execFee', 0)),  # Make negative (Bybit returns positive for fees paid)
-                                'asset': 'USDT',
-                                'tranId': exec.get('execId', ''),
-                                'tradeId': '',
-                                'side': '',
-                                'quantity': '',
-                                'price': '',
-                                'realizedPnl': ''
-                            })
-                        else:
-                            # Trade record
-                            combined_data.append({
-                                'type': 'TRADE',
-                                'time': datetime.fromtimestamp(int(exec.get('execTime', 0)) / 1000).strftime('%Y-%m-%d %H:%M:%S'),
-                                'symbol': exec.get('symbol', ''),
-                                'amount': abs(float(exec.get('execFee', 0))),  # Commission (always positive)
-                                'asset': 'USDT',
-                                'tranId': exec.get('execId', ''),
-                                'tradeId': exec.get('orderId', ''),
-                                'side': exec.get('side', ''),
-                                'quantity': float(exec.get('execQty', 0)),
-                                'price': float(exec.get('execPrice', 0)),
-                                'realizedPnl': float(exec.get('closedPnl', 0)) if exec.get('closedPnl') else 0
-                            })
-                    
-                    cursor = result.get('nextPageCursor')
-                    if not cursor:
-                        break
-                    time.sleep(0.1)
-                
-                current_start = current_end + 1
-                time.sleep(0.2)
-        
-        # Also get closed PnL records
-        current_start = start_timestamp
-        while current_start < end_timestamp:
-            current_end = min(current_start + seven_days_ms, end_timestamp)
-            
-            params = {
+        # Now get detailed data for each symbol, plus the closed PnL records, all concurrently
+        symbol_requests = [
+            ("/v5/execution/list", {
                 'category': 'linear',
-                'startTime': str(current_start),
-                'endTime': str(current_end),
+                'symbol': symbol,
+                'startTime': str(window_start),
+                'endTime': str(window_end),
                 'limit': '100'
-            }
-            
-            cursor = None
-            while True:
-                if cursor:
-                    params['cursor'] = cursor
-                
-                result = self._bb_signed_request("/v5/position/closed-pnl", params)
-                if not result:
-                    break
+            })
+            for symbol in symbols if symbol
+            for window_start, window_end in windows
+        ]
+        pnl_requests = [
+            ("/v5/position/closed-pnl", {
+                'category': 'linear',
+                'startTime': str(window_start),
+                'endTime': str(window_end),
+                'limit': '100'
+            })
+            for window_start, window_end in windows
+        ]
+        results = await self._bb_fetch_all(session, symbol_requests + pnl_requests)
+        symbol_executions = results[:len(symbol_requests)]
+        window_pnl_records = results[len(symbol_requests):]
+        
+        for executions in symbol_executions:
+            for exec in executions:
+                exec_type = exec.get('execType', '')
                 
-                pnl_records = result.get('list', [])
-                for pnl in pnl_records:
-                    # Add closed PnL as commission record (for tracking purposes)
+                if exec_type == 'Funding':
+                    # Funding fee record
                     combined_data.append({
-                        'type': 'COMMISSION',
-                        'time': datetime.fromtimestamp(int(pnl.get('updatedTime', 0)) / 1000).strftime('%Y-%m-%d %H:%M:%S'),
-                        'symbol': pnl.get('symbol', ''),
-                        'amount': 0,  # No commission on PnL record
+                        'type': 'FUNDING_FEE',
+                        'time': int(exec.get('execTime', 0)),  # epoch ms, converted once below
+                        'symbol': exec.get('symbol', ''),
+                        'amount': -float(exec.get('execFee', 0)),  # Make negative (Bybit returns positive for fees paid)
                         'asset': 'USDT',
-                        'tranId': pnl.get('orderId', ''),
-                        'tradeId': pnl.get('orderId', ''),
-                        'side': pnl.get('side', ''),
-                        'quantity': float(pnl.get('qty', 0)),
-                        'price': float(pnl.get('avgEntryPrice', 0)),
-                        'realizedPnl': float(pnl.get('closedPnl', 0))
+                        'tranId': exec.get('execId', ''),
+                        'tradeId': '',
+                        'side': '',
+                        'quantity': np.nan,  # NaN keeps the numeric columns float (blank when exported)
+                        'price': np.nan,
+                        'realizedPnl': np.nan
                     })
+                else:
+                    # Trade record
+                    combined_data.append({
+                        'type': 'TRADE',
+                        'time': int(exec.get('execTime', 0)),  # epoch ms, converted once below
+                        'symbol': exec.get('symbol', ''),
+                        'amount': abs(float(exec.get('execFee', 0))),  # Commission (always positive)
+                        'asset': 'USDT',
+                        'tranId': exec.get('execId', ''),
+                        'tradeId': exec.get('orderId', ''),
+                        'side': exec.get('side', ''),
+                        'quantity': float(exec.get('execQty', 0)),
+                        'price': float(exec.get('execPrice', 0)),
+                        'realizedPnl': float(exec.get('closedPnl', 0)) if exec.get('closedPnl') else 0
+                    })
+        
+        for pnl_records in window_pnl_records:
+            for pnl in pnl_records:
+                if target_symbols and pnl.get('symbol') not in target_symbols:
+                    continue
                 
-                cursor = result.get('nextPageCursor')
-                if not cursor:
-                    break
-                time.sleep(0.1)
-            
-            current_start = current_end + 1
+                # Add closed PnL as commission record (for tracking purposes)
+                combined_data.append({
+                    'type': 'COMMISSION',
+                    'time': int(pnl.get('updatedTime', 0)),  # epoch ms, converted once below
+                    'symbol': pnl.get('symbol', ''),
+                    'amount': 0,  # No commission on PnL record
+                    'asset': 'USDT',
+                    'tranId': pnl.get('orderId', ''),
+                    'tradeId': pnl.get('orderId', ''),
+                    'side': pnl.get('side', ''),
+                    'quantity': float(pnl.get('qty', 0)),
+                    'price': float(pnl.get('avgEntryPrice', 0)),
+                    'realizedPnl': float(pnl.get('closedPnl', 0))
+                })
         
         df = pd.DataFrame(combined_data)
         if len(df) > 0:
-            df = df.sort_values('time')
+            # Sort on the raw int64 timestamps, then convert the whole column to local datetimes at once
+            df = df.sort_values('time', kind='mergesort')
+            df = df.assign(time=self._to_local_datetime(df['time']))
+            df = df.astype({column: 'category' for column in ['symbol', 'type', 'side', 'asset']})
         
         logger.info(f"✅ Extracted {len(df)} Bybit records")
         return df
     
-    def analyze_performance(self, start_date: str, start_time: str, end_date: str, end_time: str, target_coins: list = None):
-        """Analyze funding arbitrage performance for specific date/time range"""
+    def _group_by_key(self, df: pd.DataFrame, key: str):
+        """Split a DataFrame into a {key value: rows} dict with a single groupby pass"""
+        if key not in df.columns:
+            return {}
+        return {value: group for value, group in df.groupby(key, sort=False, observed=True)}
+    
+    def _sum_by_key(self, df: pd.DataFrame, key: str, column: str):
+        """{key value: column total} for every key in one groupby pass"""
+        if len(df) == 0:
+            return {}
+        return df.groupby(key, sort=False, observed=True)[column].sum().to_dict()
+    
+    def _record_summary(self, df: pd.DataFrame, keys: list, column: str):
+        """{(key values): count, total and time range of the records} in one groupby pass"""
+        if len(df) == 0:
+            return {}
+        summary = df.groupby(keys, sort=False, observed=True).agg(
+            count=(column, 'size'),
+            total=(column, 'sum'),
+            first=('time', 'min'),
+            last=('time', 'max')
+        )
+        return {
+            (key if isinstance(key, tuple) else (key,)): row
+            for key, row in summary.to_dict('index').items()
+        }
+    
+    def _finalize_results(self, results_df: pd.DataFrame, duration_hours: float):
+        """Add realized PnL, percentage, APR and commission payback columns and return the summary totals
+        
+        Everything is derived in one pass over the raw column arrays, so the totals do not need
+        another scan of results_df.
+        """
+        symbols = results_df['Symbol'].to_numpy()
+        commission_open = results_df['Commission (Open)'].to_numpy(dtype=float)
+        commission_close = results_df['Commission (Close)'].to_numpy(dtype=float)
+        total_funding = results_df['Funding Paid/Received'].to_numpy(dtype=float)
+        total_commission = commission_open + commission_close
+        realized_pnl = total_commission + total_funding
+        
+        # Percentages are taken on the capital per position (40 for LINK/LTC, 20 otherwise)
+        capital = np.where(np.isin(symbols, ['LINK', 'LTC']), 40.0, 20.0)
+        percentage = (realized_pnl / capital) * 100
+        funding_percentage = (total_funding / capital) * 100  # Funding only, excluding commissions
+        
+        # Annualize over the analysis period, and work out how long funding takes to cover commissions
+        commission_cost = np.abs(total_commission)
+        if duration_hours > 0:
+            apr = np.where(percentage != 0, (percentage / duration_hours) * (365 * 24), 0.0)
+            apr_excluding_commission = np.where(funding_percentage != 0, (funding_percentage / duration_hours) * (365 * 24), 0.0)
+            funding_per_hour = total_funding / duration_hours
+        else:
+            apr = apr_excluding_commission = funding_per_hour = np.zeros(len(results_df))
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            days_to_cover = commission_cost / funding_per_hour / 24
+        
+        # No commission costs -> 0; funding not positive (or no duration to rate it) -> large number
+        days_until_commission_paid = np.select(
+            [commission_cost == 0, funding_per_hour > 0],
+            [0, days_to_cover],
+            default=999999
+        )
+        
+        results_df['Realized PnL'] = realized_pnl
+        results_df['Percentage'] = percentage
+        results_df['Duration (hours)'] = float(duration_hours)
+        results_df['APR'] = apr
+        results_df['APR (excluding commission)'] = apr_excluding_commission
+        results_df['Days until commission paid'] = days_until_commission_paid
+        
+        return {
+            'pnl': realized_pnl.sum(),
+            'commission_open': commission_open.sum(),
+            'commission_close': commission_close.sum(),
+            'funding': total_funding.sum()
+        }
+    
+    def _classify_trade_dirs(self, dirs: pd.Series):
+        """Open/close and long/short flags for Hyperliquid trade directions
+        
+        Directions come from a small fixed set ('Open Long', 'Close Short', ...), so each
+        distinct value is classified once and the flags are broadcast back by code.
+        """
+        codes, unique_dirs = pd.factorize(dirs)
+        lowered = [str(d).lower() for d in unique_dirs]
+        
+        # Trailing False entry is what missing directions (code -1) pick up
+        is_open = np.array(['open' in d for d in lowered] + [False])
+        is_close = np.array(['close' in d for d in lowered] + [False]) & ~is_open
+        is_long = np.array(['long' in d or 'buy' in d for d in lowered] + [False])
+        is_short = np.array(['short' in d or 'sell' in d for d in lowered] + [False]) & ~is_long
+        return is_open[codes], is_close[codes], is_long[codes], is_short[codes]
+    
+    def _net_position_summary(self, hl_trades_df: pd.DataFrame):
+        """Signed net size and opened/closed flags for every coin in one numpy pass"""
+        if len(hl_trades_df) == 0:
+            return {}
+        is_open, is_close, is_long, is_short = self._classify_trade_dirs(hl_trades_df['dir'])
+        
+        # Long open / close short = positive, short open / close long = negative
+        trade_sign = np.select(
+            [is_open & is_long, is_open & is_short, is_close & is_long, is_close & is_short],
+            [1.0, -1.0, -1.0, 1.0],
+            default=0.0
+        )
+        signed_sz = trade_sign * hl_trades_df['sz'].to_numpy(dtype=float)
+        
+        coin_codes, coins = pd.factorize(hl_trades_df['coin'], sort=False)
+        net = np.bincount(coin_codes, weights=signed_sz, minlength=len(coins))
+        opened = np.bincount(coin_codes, weights=is_open, minlength=len(coins)) > 0
+        closed = np.bincount(coin_codes, weights=is_close, minlength=len(coins)) > 0
+        return {
+            coin: (float(net[i]), bool(opened[i]), bool(closed[i]))
+            for i, coin in enumerate(coins)
+        }
+    
+    def _trade_side_summary(self, hl_trades_df: pd.DataFrame):
+        """Aggregate Hyperliquid trades per (coin, open/close) in one groupby pass"""
+        if len(hl_trades_df) == 0:
+            return {}
+        is_open, is_close, _, _ = self._classify_trade_dirs(hl_trades_df['dir'])
+        side_oc = np.select([is_open, is_close], ['open', 'close'], default='')
+        sides = pd.DataFrame({
+            'coin': hl_trades_df['coin'].to_numpy(),
+            'side_oc': side_oc,
+            'sz': hl_trades_df['sz'].to_numpy(dtype=float),
+            'notional': (hl_trades_df['sz'].abs() * hl_trades_df['px']).to_numpy(dtype=float),
+            'fee': hl_trades_df['fee'].to_numpy(dtype=float)
+        })
+        agg = sides[sides['side_oc'] != ''].groupby(['coin', 'side_oc'], sort=False).agg(
+            count=('sz', 'size'),
+            size=('sz', 'sum'),
+            notional=('notional', 'sum'),
+            fee=('fee', 'sum')
+        )
+        return agg.to_dict('index')
+    
+    async def _extract_all(self, start_datetime: datetime, end_datetime: datetime, target_coins: set, target_symbols: set):
+        """Run the Hyperliquid and Bybit extractions concurrently over one pooled session"""
+        connector = aiohttp.TCPConnector(limit=HTTP_POOL_SIZE)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            return await asyncio.gather(
+                self.extract_hyperliquid_trades(session, start_datetime, end_datetime, target_coins),
+                self.extract_hyperliquid_funding(session, start_datetime, end_datetime, target_coins),
+                self.extract_bybit_data(session, start_datetime, end_datetime, target_symbols)
+            )
+    
+    def _sheet_rows(self, df: pd.DataFrame):
+        """Yield the rows of df as tuples of plain Python values, with None for missing ones
+        
+        Rows are converted EXCEL_CHUNK_ROWS at a time, so only one chunk is ever held as Python objects.
+        """
+        for start in range(0, len(df), EXCEL_CHUNK_ROWS):
+            chunk = df.iloc[start:start + EXCEL_CHUNK_ROWS]
+            yield from chunk.astype(object).where(chunk.notna(), None).itertuples(index=False, name=None)
+    
+    def _write_excel(self, excel_filename: str, sheets: dict):
+        """Write {sheet name: DataFrame} to an Excel file (runs on the background writer thread)
+        
+        xlsxwriter's constant_memory mode flushes each row to disk as soon as the next one is
+        started, so rows are written strictly in order instead of through DataFrame.to_excel
+        (which fills sheets column by column and would lose data in this mode).
+        """
+        try:
+            import xlsxwriter
+        except ImportError:
+            return self._write_excel_openpyxl(excel_filename, sheets)
+        
+        workbook = xlsxwriter.Workbook(excel_filename, {
+            'constant_memory': True,
+            'default_date_format': 'yyyy-mm-dd hh:mm:ss',
+            'strings_to_formulas': False,
+            'strings_to_urls': False
+        })
+        header_format = workbook.add_format({'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'})
+        try:
+            for sheet_name, df in sheets.items():
+                worksheet = workbook.add_worksheet(sheet_name)
+                worksheet.write_row(0, 0, [str(column) for column in df.columns], header_format)
+                
+                for row_number, row in enumerate(self._sheet_rows(df), start=1):
+                    worksheet.write_row(row_number, 0, row)
+                logger.info(f"✅ Added {sheet_name.replace('_', ' ')} sheet ({len(df)} rows)")
+        finally:
+            workbook.close()
+        
+        logger.info(f"\n✅ Excel file created: {excel_filename}")
+        return excel_filename
+    
+    def _write_excel_openpyxl(self, excel_filename: str, sheets: dict):
+        """Fallback for _write_excel when only openpyxl is installed, using a write-only workbook"""
+        import openpyxl
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import Font
+        
+        workbook = openpyxl.Workbook(write_only=True)
+        header_font = Font(bold=True)
+        for sheet_name, df in sheets.items():
+            worksheet = workbook.create_sheet(sheet_name)
+            header = []
+            for column in df.columns:
+                cell = WriteOnlyCell(worksheet, value=str(column))
+                cell.font = header_font
+                header.append(cell)
+            worksheet.append(header)
+            
+            for row in self._sheet_rows(df):
+                worksheet.append(row)
+            logger.info(f"✅ Added {sheet_name.replace('_', ' ')} sheet ({len(df)} rows)")
+        workbook.save(excel_filename)
+        
+        logger.info(f"\n✅ Excel file created: {excel_filename}")
+        return excel_filename
+    
+    def _log_excel_failure(self, future):
+        """Done callback for the background Excel write, so a failure is reported even if nobody waits on it"""
+        if not future.cancelled() and future.exception() is not None:
+            logger.error(f"❌ Excel export failed: {future.exception()!r}")
+    
+    def _write_feather(self, base_filename: str, sheets: dict):
+        """Write each {sheet name: DataFrame} to <base_filename>_<sheet name>.feather"""
+        for sheet_name, df in sheets.items():
+            feather_filename = f"{base_filename}_{sheet_name}.feather"
+            try:
+                # Feather only stores a default index
+                df.reset_index(drop=True).to_feather(feather_filename)
+            except ImportError:
+                logger.warning("⚠️  pyarrow not installed, skipping Feather export. Install with: pip install pyarrow")
+                return
+            logger.info(f"✅ Feather file created: {feather_filename} ({len(df)} rows)")
+    
+    def analyze_performance(self, start_date: str, start_time: str, end_date: str, end_time: str, target_coins: list = None,
+                            export_format: str = 'xlsx'):
+        """Analyze funding arbitrage performance for specific date/time range (blocking)
+        
+        Runs analyze_performance_async on a new event loop, so it cannot be called while a loop is
+        already running (Jupyter, other coroutines); await analyze_performance_async there instead.
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.analyze_performance_async(start_date, start_time, end_date, end_time, target_coins,
+                                                              export_format))
+        raise RuntimeError("analyze_performance() cannot run inside a running event loop; "
+                           "use 'await analyzer.analyze_performance_async(...)' instead")
+    
+    async def analyze_performance_async(self, start_date: str, start_time: str, end_date: str, end_time: str,
+                                        target_coins: list = None, export_format: str = 'xlsx'):
+        """Analyze funding arbitrage performance for specific date/time range
+        
+        export_format picks the detail export written next to the summary CSV: 'xlsx' (four-sheet
+        workbook), 'feather' (one Feather file per data sheet) or None (CSV only).
+        
+        The workbook is written in the background, so the returned .xlsx path only exists once
+        self.excel_future has completed; a failed write is logged and raised by excel_future.result().
+        """
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export_format {export_format!r}, expected one of {EXPORT_FORMATS}")
         
         # Parse start and end datetime
         start_datetime = self._parse_datetime_string(start_date, start_time)
@@ -396,76 +776,54 @@ class FundingArbitrageAnalyzer:
         if target_coins is None:
             target_coins = ['DOGE', 'ARB', 'ENA', 'NEIROETH', 'MOODENG', 'FARTCOIN', 'IP', 'HYPE', 'RESOLV', 'PUMP']
         
-        # Extract data for the specified period
-        hl_trades_df_raw = self.extract_hyperliquid_trades(start_datetime, end_datetime)
-        hl_funding_df_raw = self.extract_hyperliquid_funding(start_datetime, end_datetime)
-        bb_combined_df_raw = self.extract_bybit_data(start_datetime, end_datetime)
-        
-        # Debug: Check actual date ranges in extracted data
-        if len(hl_trades_df_raw) > 0:
-            logger.info(f"📊 HL Trades date range: {hl_trades_df_raw['time'].min()} to {hl_trades_df_raw['time'].max()}")
-            logger.info(f"📊 HL Trades total records: {len(hl_trades_df_raw)}")
-        if len(hl_funding_df_raw) > 0:
-            logger.info(f"📊 HL Funding date range: {hl_funding_df_raw['time'].min()} to {hl_funding_df_raw['time'].max()}")
-            logger.info(f"📊 HL Funding total records: {len(hl_funding_df_raw)}")
-        if len(bb_combined_df_raw) > 0:
-            logger.info(f"📊 BB Data date range: {bb_combined_df_raw['time'].min()} to {bb_combined_df_raw['time'].max()}")
-            logger.info(f"📊 BB Data total records: {len(bb_combined_df_raw)}")
-        
-        # Filter for target coins (for analysis)
-        if len(hl_trades_df_raw) > 0:
-            hl_trades_df = hl_trades_df_raw[hl_trades_df_raw['coin'].isin(target_coins)]
-        else:
-            hl_trades_df = hl_trades_df_raw
-            
-        if len(hl_funding_df_raw) > 0:
-            hl_funding_df = hl_funding_df_raw[hl_funding_df_raw['coin'].isin(target_coins)]
-        else:
-            hl_funding_df = hl_funding_df_raw
-        
+        # Extract data for the specified period (all sources concurrently), keeping only target coins
         target_bb_symbols = [coin + 'USDT' for coin in target_coins]
-        if len(bb_combined_df_raw) > 0:
-            bb_combined_df = bb_combined_df_raw[bb_combined_df_raw['symbol'].isin(target_bb_symbols)]
-        else:
-            bb_combined_df = bb_combined_df_raw
+        hl_trades_df, hl_funding_df, bb_combined_df = await self._extract_all(
+            start_datetime, end_datetime, set(target_coins), set(target_bb_symbols)
+        )
         
-        # Debug: Check filtered data
-        logger.info(f"📊 After filtering for target coins:")
-        logger.info(f"📊 HL Trades: {len(hl_trades_df)} records")
-        logger.info(f"📊 HL Funding: {len(hl_funding_df)} records") 
-        logger.info(f"📊 BB Data: {len(bb_combined_df)} records")
-        
-        # Convert time columns to datetime
+        # Debug: Check actual date ranges in extracted data
         if len(hl_trades_df) > 0:
-            hl_trades_df['datetime'] = pd.to_datetime(hl_trades_df['time'])
+            logger.info(f"📊 HL Trades date range: {hl_trades_df['time'].min()} to {hl_trades_df['time'].max()}")
+            logger.info(f"📊 HL Trades total records: {len(hl_trades_df)}")
         if len(hl_funding_df) > 0:
-            hl_funding_df['datetime'] = pd.to_datetime(hl_funding_df['time'])
+            logger.info(f"📊 HL Funding date range: {hl_funding_df['time'].min()} to {hl_funding_df['time'].max()}")
+            logger.info(f"📊 HL Funding total records: {len(hl_funding_df)}")
         if len(bb_combined_df) > 0:
-            bb_combined_df['datetime'] = pd.to_datetime(bb_combined_df['time'])
+            logger.info(f"📊 BB Data date range: {bb_combined_df['time'].min()} to {bb_combined_df['time'].max()}")
+            logger.info(f"📊 BB Data total records: {len(bb_combined_df)}")
         
         logger.info(f"📊 Filtered data: {len(hl_trades_df)} HL trades, {len(hl_funding_df)} HL funding, {len(bb_combined_df)} BB records")
         
-        # Analyze each coin
-        analysis_results = []
+        # Partition the data per coin once instead of masking the full frames for every coin
+        trades_by_coin = self._group_by_key(hl_trades_df, 'coin')
+        funding_by_coin = self._group_by_key(hl_funding_df, 'coin')
+        bb_by_symbol = self._group_by_key(bb_combined_df, 'symbol')
+        # Net positions and open/close totals per coin, computed for all coins up front
+        net_positions = self._net_position_summary(hl_trades_df)
+        trade_sides = self._trade_side_summary(hl_trades_df)
+        # Fee, funding and Bybit amount totals per coin/symbol, also computed up front
+        hl_fee_totals = self._sum_by_key(hl_trades_df, 'coin', 'fee')
+        hl_funding_totals = self._record_summary(hl_funding_df, ['coin'], 'payment')
+        bb_totals = self._record_summary(bb_combined_df, ['symbol', 'type'], 'amount')
+        
+        # Per-coin details are only formatted when debug logging is on
+        debug_enabled = logger.isEnabledFor(logging.DEBUG)
+        
+        # Analyze each coin, collecting the results column by column
+        result_columns = {column: [] for column in [
+            'Symbol', 'Side', 'Entry Price', 'Exit Price', 'Position Size',
+            'Commission (Open)', 'Commission (Close)', 'Funding Paid/Received'
+        ]}
         
         for coin in target_coins:
-            logger.info(f"\n📊 Analyzing {coin}...")
+            if debug_enabled:
+                logger.debug(f"\n📊 Analyzing {coin}...")
             
             # Get coin-specific data
-            if len(hl_trades_df) > 0 and 'coin' in hl_trades_df.columns:
-                coin_hl_trades = hl_trades_df[hl_trades_df['coin'] == coin].copy()
-            else:
-                coin_hl_trades = pd.DataFrame()
-                
-            if len(hl_funding_df) > 0 and 'coin' in hl_funding_df.columns:
-                coin_hl_funding = hl_funding_df[hl_funding_df['coin'] == coin].copy()
-            else:
-                coin_hl_funding = pd.DataFrame()
-                
-            if len(bb_combined_df) > 0 and 'symbol' in bb_combined_df.columns:
-                coin_bb_data = bb_combined_df[bb_combined_df['symbol'] == coin + 'USDT'].copy()
-            else:
-                coin_bb_data = pd.DataFrame()
+            coin_hl_trades = trades_by_coin.get(coin, hl_trades_df.iloc[:0])
+            coin_hl_funding = funding_by_coin.get(coin, hl_funding_df.iloc[:0])
+            coin_bb_data = bb_by_symbol.get(coin + 'USDT', bb_combined_df.iloc[:0])
             
             if len(coin_hl_trades) == 0 and len(coin_hl_funding) == 0 and len(coin_bb_data) == 0:
                 logger.info(f"  No data found for {coin}")
@@ -478,24 +836,8 @@ class FundingArbitrageAnalyzer:
             position_closed = False
             
             if len(coin_hl_trades) > 0:
-                # Calculate net position: sum all trade sizes with proper signs
-                for _, trade in coin_hl_trades.iterrows():
-                    trade_size = float(trade['sz'])
-                    trade_dir = str(trade['dir']).lower()
-                    
-                    # Determine sign based on trade direction
-                    if 'open' in trade_dir:
-                        position_opened = True
-                        if 'long' in trade_dir or 'buy' in trade_dir:
-                            net_position_size += trade_size  # Long open = positive
-                        elif 'short' in trade_dir or 'sell' in trade_dir:
-                            net_position_size -= trade_size  # Short open = negative
-                    elif 'close' in trade_dir:
-                        position_closed = True
-                        if 'long' in trade_dir or 'buy' in trade_dir:
-                            net_position_size -= trade_size  # Close long = negative
-                        elif 'short' in trade_dir or 'sell' in trade_dir:
-                            net_position_size += trade_size  # Close short = positive
+                # Net position: sum of all trade sizes with proper signs
+                net_position_size, position_opened, position_closed = net_positions[coin]
                 
                 # Determine position status and side from net size
                 if abs(net_position_size) > 0.001:  # Position is open
@@ -514,10 +856,11 @@ class FundingArbitrageAnalyzer:
                         position_side = "Short hl (closed)"
                 
                 # Debug: Log net position calculation
-                logger.info(f"  {coin} Net Position Logic:")
-                logger.info(f"    Net position size: {net_position_size:.6f}")
-                logger.info(f"    Position is open: {position_is_open}")
-                logger.info(f"    Position side: {position_side}")
+                if debug_enabled:
+                    logger.debug(f"  {coin} Net Position Logic:")
+                    logger.debug(f"    Net position size: {net_position_size:.6f}")
+                    logger.debug(f"    Position is open: {position_is_open}")
+                    logger.debug(f"    Position side: {position_side}")
             else:
                 # No trades, check funding to infer position
                 position_is_open = True  # Default to open if no trades
@@ -528,31 +871,26 @@ class FundingArbitrageAnalyzer:
                     else:
                         position_side = "Short hl"
             
-            # Calculate entry and exit prices using new logic
-            entry_price = ""
-            exit_price = ""
+            # Calculate entry and exit prices using new logic (NaN when there is none)
+            entry_price = np.nan
+            exit_price = np.nan
             position_size = abs(net_position_size) if len(coin_hl_trades) > 0 else 0
             
-            if position_opened and len(coin_hl_trades) > 0:
-                # Get open trades for entry price calculation
-                open_trades = coin_hl_trades[coin_hl_trades['dir'].str.contains('Open', case=False, na=False)]
-                if len(open_trades) > 0:
-                    # Use weighted average price for entry
-                    total_size = abs(open_trades['sz'].sum())
-                    if total_size > 0:
-                        total_notional = (open_trades['sz'].abs() * open_trades['px']).sum()
-                        entry_price = total_notional / total_size
+            open_stats = trade_sides.get((coin, 'open'))
+            close_stats = trade_sides.get((coin, 'close'))
+            
+            if position_opened and open_stats:
+                # Use weighted average price for entry
+                total_size = abs(open_stats['size'])
+                if total_size > 0:
+                    entry_price = open_stats['notional'] / total_size
             
             # Only show exit price if position is actually closed
-            if position_closed and not position_is_open and len(coin_hl_trades) > 0:
-                # Get close trades for exit price calculation
-                close_trades = coin_hl_trades[coin_hl_trades['dir'].str.contains('Close', case=False, na=False)]
-                if len(close_trades) > 0:
-                    # Use weighted average price for exit
-                    total_size = abs(close_trades['sz'].sum())
-                    if total_size > 0:
-                        total_notional = (close_trades['sz'].abs() * close_trades['px']).sum()
-                        exit_price = total_notional / total_size
+            if position_closed and not position_is_open and close_stats:
+                # Use weighted average price for exit
+                total_size = abs(close_stats['size'])
+                if total_size > 0:
+                    exit_price = close_stats['notional'] / total_size
             
             # Calculate commissions
             hl_commission_open = 0
@@ -562,188 +900,117 @@ class FundingArbitrageAnalyzer:
                 # Position is still open - all HL fees are open commissions
                 if len(coin_hl_trades) > 0:
                     # Hyperliquid fees are positive, make them negative (costs)
-                    hl_commission_open = -coin_hl_trades['fee'].sum()
+                    hl_commission_open = -hl_fee_totals.get(coin, 0)
             else:
                 # Position was closed - split HL fees between open and close trades
-                if len(open_trades) > 0:
+                if open_stats:
                     # Hyperliquid fees are positive, make them negative (costs)
-                    hl_commission_open = -open_trades['fee'].sum()
-                if len(close_trades) > 0:
+                    hl_commission_open = -open_stats['fee']
+                if close_stats:
                     # Hyperliquid fees are positive, make them negative (costs)
-                    hl_commission_close = -close_trades['fee'].sum()
+                    hl_commission_close = -close_stats['fee']
             
             # For Bybit: ALL commissions are treated as open commissions
-            bb_trades = coin_bb_data[coin_bb_data['type'] == 'TRADE']
+            bb_symbol = coin + 'USDT'
+            bb_trades = bb_totals.get((bb_symbol, 'TRADE'))
             bb_commission_open = 0
             bb_commission_close = 0
             
-            if len(bb_trades) > 0:
+            if bb_trades:
                 # Bybit fees are already negative in the data
-                bb_commission_open = -abs(bb_trades['amount'].sum())
+                bb_commission_open = -abs(bb_trades['total'])
                 # Debug: Log commission details
-                logger.info(f"  {coin} BB commission details:")
-                logger.info(f"    BB trade records: {len(bb_trades)} (total: {bb_commission_open:.6f})")
-                if len(bb_trades) > 0:
-                    logger.info(f"    BB trade date range: {bb_trades['time'].min()} to {bb_trades['time'].max()}")
+                if debug_enabled:
+                    logger.debug(f"  {coin} BB commission details:")
+                    logger.debug(f"    BB trade records: {bb_trades['count']} (total: {bb_commission_open:.6f})")
+                    logger.debug(f"    BB trade date range: {bb_trades['first']} to {bb_trades['last']}")
             
             total_commission_open = hl_commission_open + bb_commission_open
             total_commission_close = hl_commission_close
             
             # Calculate funding
-            hl_funding_total = coin_hl_funding['payment'].sum() if len(coin_hl_funding) > 0 else 0
-            bb_funding_total = coin_bb_data[coin_bb_data['type'] == 'FUNDING_FEE']['amount'].sum() if len(coin_bb_data) > 0 else 0
+            hl_funding = hl_funding_totals.get((coin,))
+            bb_funding = bb_totals.get((bb_symbol, 'FUNDING_FEE'))
+            hl_funding_total = hl_funding['total'] if hl_funding else 0
+            bb_funding_total = bb_funding['total'] if bb_funding else 0
             total_funding = hl_funding_total + bb_funding_total
             
             # Debug: Log funding calculation details
-            if len(coin_hl_funding) > 0 or bb_funding_total != 0:
-                logger.info(f"  {coin} funding details:")
-                logger.info(f"    HL funding records: {len(coin_hl_funding)} (total: {hl_funding_total:.6f})")
-                logger.info(f"    BB funding total: {bb_funding_total:.6f}")
-                if len(coin_hl_funding) > 0:
-                    logger.info(f"    HL funding date range: {coin_hl_funding['time'].min()} to {coin_hl_funding['time'].max()}")
-                bb_funding_records = coin_bb_data[coin_bb_data['type'] == 'FUNDING_FEE']
-                if len(bb_funding_records) > 0:
-                    logger.info(f"    BB funding records: {len(bb_funding_records)}")
-                    logger.info(f"    BB funding date range: {bb_funding_records['time'].min()} to {bb_funding_records['time'].max()}")
-            
-            # Calculate total PnL
-            realized_pnl = total_commission_open + total_commission_close + total_funding
+            if debug_enabled and (hl_funding or bb_funding_total != 0):
+                logger.debug(f"  {coin} funding details:")
+                logger.debug(f"    HL funding records: {hl_funding['count'] if hl_funding else 0} (total: {hl_funding_total:.6f})")
+                logger.debug(f"    BB funding total: {bb_funding_total:.6f}")
+                if hl_funding:
+                    logger.debug(f"    HL funding date range: {hl_funding['first']} to {hl_funding['last']}")
+                if bb_funding:
+                    logger.debug(f"    BB funding records: {bb_funding['count']}")
+                    logger.debug(f"    BB funding date range: {bb_funding['first']} to {bb_funding['last']}")
             
-            # Calculate percentage and APR
-            if coin in ['LINK', 'LTC']:
-                percentage = (realized_pnl / 40) * 100
-            else:
-                percentage = (realized_pnl / 20) * 100
-            
-            # Calculate duration and APR using specified analysis period
-            duration = end_datetime - start_datetime
-            duration_hours = duration.total_seconds() / 3600
-            
-            # Calculate APR based on the specified analysis period
-            apr = 0
-            if duration_hours > 0 and percentage != 0:
-                apr = (percentage / duration_hours) * (365 * 24)  # Annualize
-            
-            # Calculate APR excluding commissions (funding only)
-            funding_only_pnl = total_funding
-            if coin in ['LINK', 'LTC']:
-                funding_percentage = (funding_only_pnl / 40) * 100
-            else:
-                funding_percentage = (funding_only_pnl / 20) * 100
-            
-            apr_excluding_commission = 0
-            if duration_hours > 0 and funding_percentage != 0:
-                apr_excluding_commission = (funding_percentage / duration_hours) * (365 * 24)
-            
-            # Calculate how many days it took for commission to be paid
-            total_commission_cost = abs(total_commission_open + total_commission_close)
-            days_until_commission_paid = 999999  # Default large number
-            
-            if total_commission_cost > 0 and total_funding > 0:
-                if total_funding >= total_commission_cost:
-                    # Funding has already covered commission costs
-                    funding_per_hour = total_funding / duration_hours if duration_hours > 0 else 0
-                    if funding_per_hour > 0:
-                        hours_to_cover = total_commission_cost / funding_per_hour
-                        days_until_commission_paid = hours_to_cover / 24
-                    else:
-                        days_until_commission_paid = 0
-                else:
-                    # Funding is positive but hasn't covered commission yet
-                    funding_per_hour = total_funding / duration_hours if duration_hours > 0 else 0
-                    if funding_per_hour > 0:
-                        hours_to_cover = total_commission_cost / funding_per_hour
-                        days_until_commission_paid = hours_to_cover / 24
-                    else:
-                        days_until_commission_paid = 999999
-            elif total_commission_cost > 0 and total_funding <= 0:
-                # Funding is negative or zero, set to large number
-                days_until_commission_paid = 999999
-            elif total_commission_cost == 0:
-                # No commission costs, set to 0
-                days_until_commission_paid = 0
-            
-            logger.info(f"  Position: {position_side}")
-            logger.info(f"  Entry: {entry_price}, Exit: {exit_price}")
-            logger.info(f"  Size: {position_size}")
-            logger.info(f"  Commission Open: {total_commission_open:.6f}, Close: {total_commission_close:.6f}")
-            logger.info(f"  Funding: {total_funding:.6f}")
-            logger.info(f"  Realized PnL: {realized_pnl:.6f}")
-            logger.info(f"  Percentage: {percentage:.4f}%")
-            logger.info(f"  Duration: {duration_hours:.2f} hours")
-            logger.info(f"  APR: {apr:.4f}%")
-            logger.info(f"  APR (excluding commission): {apr_excluding_commission:.4f}%")
-            logger.info(f"  Days until commission paid: {days_until_commission_paid:.2f}")
-            
-            analysis_results.append({
-                'Symbol': coin,
-                'Side': position_side,
-                'Entry Price': entry_price if entry_price != "" else "",
-                'Exit Price': exit_price if exit_price != "" else "",
-                'Position Size': position_size,
-                'Commission (Open)': total_commission_open,
-                'Commission (Close)': total_commission_close,
-                'Funding Paid/Received': total_funding,
-                'Realized PnL': realized_pnl,
-                'Percentage': percentage,
-                'Duration (hours)': duration_hours,
-                'APR': apr,
-                'APR (excluding commission)': apr_excluding_commission,
-                'Days until commission paid': days_until_commission_paid
-            })
+            row = (
+                coin, position_side, entry_price, exit_price, position_size,
+                total_commission_open, total_commission_close, total_funding
+            )
+            for values, value in zip(result_columns.values(), row):
+                values.append(value)
         
         # Create results DataFrame
-        results_df = pd.DataFrame(analysis_results)
+        # Everything after Symbol/Side is numeric; clean float64 columns keep the writers on their fast paths
+        results_df = pd.DataFrame(result_columns).astype({column: 'float64' for column in list(result_columns)[2:]})
+        
+        # PnL, returns and commission payback for all coins at once over the specified analysis period
+        duration_hours = (end_datetime - start_datetime).total_seconds() / 3600
+        totals = self._finalize_results(results_df, duration_hours)
         
-        # Create Excel file with 4 sheets
+        # Create the detail export (Excel file with 4 sheets by default)
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        excel_filename = f"funding_arbitrage_analysis_bybit_{timestamp}.xlsx"
-        csv_filename = f"funding_arbitrage_analysis_bybit_{timestamp}.csv"
+        base_filename = f"funding_arbitrage_analysis_bybit_{timestamp}"
+        excel_filename = f"{base_filename}.xlsx"
+        csv_filename = f"{base_filename}.csv"
+        written_path = csv_filename  # Switched to the Excel file once its write is scheduled
+        self.excel_future = None
         
-        try:
-            import openpyxl
-            
-            with pd.ExcelWriter(excel_filename, engine='openpyxl') as writer:
-                # Sheet 1: Analysis Summary
-                results_df.to_excel(writer, sheet_name='Analysis_Summary', index=False)
-                logger.info(f"✅ Added Analysis Summary sheet ({len(results_df)} rows)")
-                
-                # Sheet 2: Hyperliquid Trades (filtered by date range AND target coins)
-                hl_trades_df.to_excel(writer, sheet_name='Hyperliquid_Trades', index=False)
-                logger.info(f"✅ Added Hyperliquid Trades sheet ({len(hl_trades_df)} rows)")
+        if export_format == 'xlsx':
+            try:
+                try:
+                    import xlsxwriter
+                except ImportError:
+                    import openpyxl  # Slower write-only fallback
                 
-                # Sheet 3: Hyperliquid Funding (filtered by date range AND target coins)
-                hl_funding_df.to_excel(writer, sheet_name='Hyperliquid_Funding', index=False)
-                logger.info(f"✅ Added Hyperliquid Funding sheet ({len(hl_funding_df)} rows)")
+                # Serialize the workbook in the background while the CSV and summary are produced
+                self.excel_future = self._excel_executor.submit(self._write_excel, excel_filename, {
+                    'Analysis_Summary': results_df,  # Sheet 1: Analysis Summary
+                    'Hyperliquid_Trades': hl_trades_df,  # Sheet 2: Hyperliquid Trades (filtered by date range AND target coins)
+                    'Hyperliquid_Funding': hl_funding_df,  # Sheet 3: Hyperliquid Funding (filtered by date range AND target coins)
+                    'Bybit_Data': bb_combined_df  # Sheet 4: Bybit Data (filtered by date range AND target coins)
+                })
+                self.excel_future.add_done_callback(self._log_excel_failure)
+                written_path = excel_filename
                 
-                # Sheet 4: Bybit Data (filtered by date range AND target coins)
-                bb_combined_df.to_excel(writer, sheet_name='Bybit_Data', index=False)
-                logger.info(f"✅ Added Bybit Data sheet ({len(bb_combined_df)} rows)")
-            
-            logger.info(f"\n✅ Excel file created: {excel_filename}")
-            
-        except ImportError:
-            logger.warning("⚠️  openpyxl not installed. Install with: pip install openpyxl")
-            logger.info("Creating CSV file instead...")
+            except ImportError:
+                logger.warning("⚠️  Neither xlsxwriter nor openpyxl installed. Install with: pip install xlsxwriter")
+                logger.info("Creating CSV file instead...")
+        elif export_format == 'feather':
+            # Columnar dumps of the data sheets; the summary goes to the CSV below
+            self._write_feather(base_filename, {
+                'Hyperliquid_Trades': hl_trades_df,
+                'Hyperliquid_Funding': hl_funding_df,
+                'Bybit_Data': bb_combined_df
+            })
         
         # Also save CSV for compatibility
         results_df.to_csv(csv_filename, index=False)
         logger.info(f"✅ CSV file created: {csv_filename}")
         
+        # Per-coin results are reported once, as a table streamed straight to stdout
         logger.info(f"\n📊 SUMMARY ({start_datetime} to {end_datetime}):")
-        print(results_df.to_string(index=False))
-        
-        # Calculate totals
-        if len(results_df) > 0:
-            total_pnl = results_df['Realized PnL'].sum()
-            total_commission_open_sum = results_df['Commission (Open)'].sum()
-            total_commission_close_sum = results_df['Commission (Close)'].sum()
-            total_funding_sum = results_df['Funding Paid/Received'].sum()
-        else:
-            total_pnl = 0
-            total_commission_open_sum = 0
-            total_commission_close_sum = 0
-            total_funding_sum = 0
+        results_df.to_string(buf=sys.stdout, index=False, na_rep='')
+        sys.stdout.write('\n')
+        
+        # Totals were accumulated alongside the derived columns (an empty table sums to 0)
+        total_pnl = totals['pnl']
+        total_commission_open_sum = totals['commission_open']
+        total_commission_close_sum = totals['commission_close']
+        total_funding_sum = totals['funding']
         
         logger.info(f"\n💰 TOTALS:")
         logger.info(f"  Total Open Commissions: {total_commission_open_sum:.6f}")
@@ -751,15 +1018,20 @@ class FundingArbitrageAnalyzer:
         logger.info(f"  Total Funding: {total_funding_sum:.6f}")
         logger.info(f"  Total Realized PnL: {total_pnl:.6f}")
         
-        return results_df, excel_filename if 'openpyxl' in globals() else csv_filename
+        return results_df, written_path
+
+def read_credentials():
+    """Read (hyperliquid_address, bybit_api_key, bybit_api_secret) from the environment, exiting if any is unset"""
+    missing = [name for name in CREDENTIAL_ENV_VARS if not os.environ.get(name)]
+    if missing:
+        sys.exit(f"❌ Missing credentials: set {', '.join(missing)} in the environment (see SETUP_GUIDE.md)")
+    return tuple(os.environ[name] for name in CREDENTIAL_ENV_VARS)
 
 def main():
     """Example usage with configurable date range"""
-    HYPERLIQUID_ADDRESS = "0x6AA154D8fac6C8D7B9F9f5Cb8637FF6FBdF5AB81"
-    BYBIT_API_KEY = "RmjkleMwl7PPiRlMhk"
-    BYBIT_API_SECRET = "rfk9mOzHJu5HUv3MqI09muIHkZ4UbcvGufFp"
+    HYPERLIQUID_ADDRESS, BYBIT_API_KEY, BYBIT_API_SECRET = read_credentials()
     
-    analyzer = FundingArbitrageAnalyzer(HYPERLIQUID_ADDRESS, BYBIT_API_KEY, BYBIT_API_SECRET)
+    analyzer = FundingArbitrageAnalyzer(HYPERLIQUID_ADDRESS, BYBIT_API_KEY, BYBIT_API_SECRET, cache_dir=".cache")
     
     # Example: Analyze performance for specified date range
     start_date = "2025-08-21"
@@ -776,6 +1048,8 @@ def main():
     print("="*80)
     
     results, output_file = analyzer.analyze_performance(start_date, start_time, end_date, end_time, target_coins)
+    if analyzer.excel_future is not None:
+        analyzer.excel_future.result()  # Wait for the background Excel write
     
     print(f"\n🎉 Analysis complete! Output file: {output_file}")
 